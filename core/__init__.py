@@ -5,5 +5,6 @@ from core.room import Room
 from core.environment import Environment
 from core.actions import Action
 from core.logger import SimulationLogger
+from core.batched import BatchedEnvironment
 
-__all__ = ['Agent', 'Room', 'Environment', 'Action', 'SimulationLogger']
+__all__ = ['Agent', 'Room', 'Environment', 'Action', 'SimulationLogger', 'BatchedEnvironment']
@@ -1,5 +1,13 @@
-from enum import Enum, auto
+from enum import Enum
+
+# Integer action codes, used by the step kernels and the logger's arrays
+EAT = 0
+MOVE = 1
+TALK = 2
+
+
 class Action(Enum):
-    MOVE = auto()
-    EAT = auto()
-    TALK = auto()
\ No newline at end of file
+    """Public action names; each value is the matching integer code."""
+    EAT = EAT
+    MOVE = MOVE
+    TALK = TALK
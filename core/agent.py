@@ -1,41 +1,28 @@
-from dataclasses import dataclass, field
-from core import room, actions
-import random
+from core.state import ArrayField
+from core.sim_kernel import SCALE
+
 
-@dataclass
 class Agent:
-    """Represents an agent in the simulation with hunger, trust, and decision-making."""
-    
-    id: int
-    location: int
-    hunger: float = 0.0
-    alive: bool = True
-    trust: dict[int, float] = field(default_factory=dict)
+    """Represents an agent in the simulation with a location and hunger.
+
+    Location, hunger and liveness are stored in the owning Environment's
+    arrays once the agent is bound; the object itself is a thin view. Trust
+    between agents lives only in the Environment's trust matrix.
+    """
+
+    __slots__ = ('_env', 'id', '_location', '_hunger', '_alive')
+
+    location = ArrayField('location', int)
+    hunger = ArrayField('hunger', float, scale=SCALE)
+    alive = ArrayField('alive', bool)
 
-    def decide(self, room: room.Room) -> tuple[actions.Action, int | None]:
-        """Decide what action to take based on current state and room."""
-        # 1st Priority: Eat if hungry and sufficient food available
-        if self.hunger > 0.4 and room.food > 0.1:
-            return actions.Action.EAT, None
-        
-        # 2nd Priority: Move to find food if very hungry and current room has little/no food
-        if self.hunger > 0.6 and room.food < 0.2:
-            if room.connectedRooms:
-                target = random.choice(room.connectedRooms)
-                return actions.Action.MOVE, target
-        
-        # 3rd Priority: Talk to other agents (build trust)
-        other_agents = [agent_id for agent_id in room.agents if agent_id != self.id]
-        if other_agents:
-            target = random.choice(other_agents)
-            return actions.Action.TALK, target
+    def __init__(self, id: int, location: int, hunger: float = 0.0, alive: bool = True):
+        self._env = None
+        self.id = id
+        self.location = location
+        self.hunger = hunger
+        self.alive = alive
 
-        if room.connectedRooms:
-            target = random.choice(room.connectedRooms)
-            return actions.Action.MOVE, target
-        
-        # Default: Eat whatever is available
-        if room.food > 0.0:
-            return actions.Action.EAT, None
-        
-        return actions.Action.TALK, None  # Do nothing
\ No newline at end of file
+    def bind(self, env) -> None:
+        """Attach this agent to the environment holding its state arrays."""
+        self._env = env
@@ -0,0 +1,287 @@
+"""Step many independent worlds together on arrays with a leading world axis."""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from core import actions, sim_kernel
+from core.config import Config
+from core.environment import Environment
+
+
+class _NumpyOps:
+    """Array operations for the NumPy backend."""
+
+    int64 = np.int64
+    float32 = np.float32
+    float64 = np.float64
+
+    def __init__(self):
+        self.xp = np
+
+    def asarray(self, array, dtype):
+        return np.array(array, dtype)
+
+    def argsort(self, array):
+        return np.argsort(array, kind='stable')
+
+    def searchsorted(self, sorted_array, values):
+        return np.searchsorted(sorted_array, values)
+
+    def nonzero(self, mask):
+        return np.nonzero(mask)
+
+    def clip(self, array, lo, hi):
+        return np.clip(array, lo, hi)
+
+    def to_int(self, array):
+        return array.astype(np.int64)
+
+    def sum_by_index(self, index, values, size):
+        return np.bincount(index, weights=values, minlength=size).astype(values.dtype)
+
+    def to_numpy(self, array):
+        return array
+
+
+class _TorchOps:
+    """Array operations for the PyTorch backend on a given device."""
+
+    def __init__(self, device: str):
+        try:
+            import torch
+        except ImportError as e:
+            raise ImportError("PyTorch is required for the torch batch backend") from e
+        self.xp = torch
+        self.device = torch.device(device)
+        self.int64 = torch.int64
+        self.float32 = torch.float32
+        self.float64 = torch.float64
+
+    def asarray(self, array, dtype):
+        return self.xp.tensor(np.asarray(array), dtype=dtype, device=self.device)
+
+    def argsort(self, array):
+        return self.xp.argsort(array, stable=True)
+
+    def searchsorted(self, sorted_array, values):
+        return self.xp.searchsorted(sorted_array, values)
+
+    def nonzero(self, mask):
+        return self.xp.nonzero(mask, as_tuple=True)
+
+    def clip(self, array, lo, hi):
+        return self.xp.clamp(array, lo, hi)
+
+    def to_int(self, array):
+        return array.to(self.xp.int64)
+
+    def sum_by_index(self, index, values, size):
+        total = self.xp.zeros(size, dtype=values.dtype, device=self.device)
+        return total.index_add_(0, index, values)
+
+    def to_numpy(self, array):
+        return array.cpu().numpy()
+
+
+class BatchedEnvironment:
+    """
+    Runs n_worlds copies of one configuration side by side.
+
+    Agent state is held as (n_worlds, N) arrays, trust as (n_worlds, N, N)
+    and room state as (n_worlds, R); the room graph and capacities are shared.
+    A step is a fixed sequence of whole-array operations, so with the torch
+    backend every world advances on the selected device at once.
+
+    World k draws from rngs[k] in the same order as Environment.step, so it
+    follows the same trajectory as Environment.from_config(config, rng=rngs[k]).
+    """
+
+    def __init__(self, config: Config, rngs: Sequence[np.random.Generator],
+                 device: Optional[str] = None):
+        """
+        Build the batched state from a configuration.
+
+        Args:
+            config: Validated simulation configuration
+            rngs: One random generator per world
+            device: None or "numpy" for NumPy arrays, else a torch device such as "cuda"
+        """
+        self.ops = _NumpyOps() if device in (None, "numpy") else _TorchOps(device)
+        self.rngs = list(rngs)
+
+        # One world built the usual way supplies the initial arrays and rates;
+        # it is never stepped, so its compiled kernel is not needed
+        template = Environment.from_config(config, rng=0, compile_kernel=False)
+        self.n_worlds = len(self.rngs)
+        self.n_agents = len(template.agents)
+        self.n_rooms = len(template.rooms)
+        self.eat_amount = template.eat_amount
+        self.hunger_step = template.hunger_step
+        self.food_regen = template.food_regen
+        # A Python float keeps float32 arithmetic on both NumPy and torch arrays
+        self.trust_increase = float(template.trust_increase)
+
+        ops = self.ops
+        shape = (self.n_worlds,)
+        self.hunger = ops.asarray(np.broadcast_to(template.hunger, shape + template.hunger.shape), ops.int64)
+        self.alive = ops.asarray(np.broadcast_to(template.alive, shape + template.alive.shape), bool)
+        self.location = ops.asarray(np.broadcast_to(template.location, shape + template.location.shape), ops.int64)
+        self.trust = ops.asarray(np.broadcast_to(template.trust, shape + template.trust.shape), ops.float32)
+        self.room_food = ops.asarray(np.broadcast_to(template.room_food, shape + template.room_food.shape), ops.int64)
+        self.room_agent_count = ops.asarray(
+            np.broadcast_to(template.room_agent_count, shape + template.room_agent_count.shape), ops.int64
+        )
+        self.room_capacity = ops.asarray(template.room_capacity, ops.int64)
+        self.conn_offsets = ops.asarray(template.conn_offsets, ops.int64)
+        self.conn_indices = ops.asarray(template.conn_indices, ops.int64)
+        self.degree = self.conn_offsets[1:] - self.conn_offsets[:-1]
+
+        # Per-world offsets that turn room and agent ids into flat indices
+        world = np.arange(self.n_worlds)[:, None]
+        self.world_index = ops.asarray(world, ops.int64)
+        self.room_base = ops.asarray(world * self.n_rooms, ops.int64)
+        self.agent_base = ops.asarray(world * self.n_agents, ops.int64)
+        self.action_counts = ops.asarray(np.zeros(self.n_worlds * len(actions.Action)), ops.int64)
+
+    def _group_rank(self, member, group):
+        """
+        Rank agents within their (world, group), in agent id order.
+
+        Args:
+            member: bool (n_worlds, N) mask of the agents being grouped
+            group: (n_worlds, N) group of each agent, in 0..R-1
+
+        Returns:
+            (rank, order, start) where order lists flat agent indices sorted by
+            (world, group), start is the position in order where each agent's
+            group begins and rank is the agent's position within it
+        """
+        ops = self.ops
+        key = ops.xp.where(member, group, self.n_rooms) + self.world_index * (self.n_rooms + 1)
+        key = key.reshape(-1)
+        order = ops.argsort(key)
+        start = ops.searchsorted(key[order], key)
+        rank = ops.argsort(order) - start
+        shape = (self.n_worlds, self.n_agents)
+        return rank.reshape(shape), order, start.reshape(shape)
+
+    def _room_sum(self, flat_room, values):
+        """Add per-agent values into their rooms, giving an (n_worlds, R) array."""
+        size = self.n_worlds * self.n_rooms
+        total = self.ops.sum_by_index(flat_room.reshape(-1), values.reshape(-1), size)
+        return total.reshape(self.n_worlds, self.n_rooms)
+
+    def step(self):
+        """
+        Decide, resolve and regenerate one step in every world.
+
+        Returns:
+            (codes, targets) as (n_worlds, N) arrays; codes are action codes
+            (-1 for dead agents) and targets are -1 when there is none
+        """
+        xp, ops = self.ops.xp, self.ops
+
+        # Each world draws in the same order as Environment.step
+        talk_draws = np.empty((self.n_worlds, self.n_agents))
+        move_draws = np.empty((self.n_worlds, self.n_agents))
+        for k, rng in enumerate(self.rngs):
+            talk_draws[k] = rng.random(self.n_agents)
+            move_draws[k] = rng.random(self.n_agents)
+        talk_draws = ops.asarray(talk_draws, ops.float64)
+        move_draws = ops.asarray(move_draws, ops.float64)
+
+        location, alive, hunger = self.location, self.alive, self.hunger
+        flat_room = location + self.room_base
+        food_at = self.room_food.reshape(-1)[flat_room]
+        in_room = self.room_agent_count.reshape(-1)[flat_room]
+        degree = self.degree[location]
+
+        # Decide, with the same priority rules as Environment._decide_all
+        m_eat = (hunger > sim_kernel.HUNGRY) & (food_at > sim_kernel.FOOD_ENOUGH)
+        m_move_hungry = (hunger > sim_kernel.STARVING) & (food_at < sim_kernel.FOOD_LOW) & (degree > 0)
+        m_talk = in_room > 1
+        m_move = degree > 0
+        m_eat_leftover = food_at > 0
+        codes = xp.where(m_eat_leftover, actions.EAT, actions.TALK)
+        codes = xp.where(m_move, actions.MOVE, codes)
+        codes = xp.where(m_talk, actions.TALK, codes)
+        codes = xp.where(m_move_hungry, actions.MOVE, codes)
+        codes = xp.where(m_eat, actions.EAT, codes)
+        codes = xp.where(alive, codes, -1)
+        targets = xp.full_like(location, -1)
+
+        # Move to a random neighbor
+        move = codes == actions.MOVE
+        if len(self.conn_indices):
+            slot = self.conn_offsets[location] + ops.to_int(move_draws * degree)
+            slot = ops.clip(slot, 0, len(self.conn_indices) - 1)
+            targets = xp.where(move, self.conn_indices[slot], targets)
+
+        # Talk to a random other agent in the room, skipping the talker's own slot
+        talk = (codes == actions.TALK) & m_talk
+        rank, order, start = self._group_rank(alive, location)
+        pick = ops.to_int(talk_draws * (in_room - 1))
+        pick = pick + ops.to_int(pick >= rank)
+        slot = ops.clip(start + pick, 0, self.n_worlds * self.n_agents - 1)
+        targets = xp.where(talk, order[slot] - self.agent_base, targets)
+
+        # Eaters share their room's food in agent id order, each taking up to
+        # eat_amount of what the earlier ones left
+        eat = codes == actions.EAT
+        eat_rank, _, _ = self._group_rank(eat, location)
+        eaten = ops.clip(food_at - self.eat_amount * eat_rank, 0, self.eat_amount)
+        eaten = xp.where(eat, eaten, 0)
+        hunger = ops.clip(hunger - eaten, 0, None)
+        room_food = self.room_food - self._room_sum(flat_room, eaten)
+
+        # Moves are checked against occupancy at the start of the step
+        destination = ops.clip(targets, 0, self.n_rooms - 1)
+        has_space = self.room_agent_count.reshape(-1)[destination + self.room_base] < self.room_capacity[destination]
+        location = xp.where(move & has_space, targets, location)
+
+        # Talking raises the talker's trust toward its partner
+        world, agent = ops.nonzero(talk)
+        partner = targets[world, agent]
+        self.trust[world, agent, partner] = ops.clip(
+            self.trust[world, agent, partner] + self.trust_increase, 0.0, 1.0
+        )
+
+        # Regenerate food, then raise hunger with a penalty in overcrowded rooms
+        room_food = ops.clip(room_food + self.food_regen, 0, sim_kernel.SCALE)
+        flat_room = location + self.room_base
+        room_agent_count = self._room_sum(flat_room, ops.to_int(alive))
+        penalty = ops.clip(
+            (40 * room_agent_count - 29 * self.room_capacity) // (2 * self.room_capacity), 0, None
+        )
+        increase = self.hunger_step + penalty.reshape(-1)[flat_room]
+        hunger = xp.where(alive, ops.clip(hunger + increase, 0, sim_kernel.SCALE), hunger)
+
+        # Running action counts per world, with dead agents in a spare slot
+        n_actions = len(actions.Action)
+        bucket = xp.where(codes >= 0, self.world_index * n_actions + codes, self.n_worlds * n_actions)
+        self.action_counts = self.action_counts + ops.sum_by_index(
+            bucket.reshape(-1), ops.to_int(codes >= 0).reshape(-1), self.n_worlds * n_actions + 1
+        )[:-1]
+
+        self.location, self.hunger = location, hunger
+        self.room_food, self.room_agent_count = room_food, room_agent_count
+        return codes, targets
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """
+        Copy the batched state to NumPy.
+
+        Returns:
+            Dictionary of (n_worlds, ...) arrays: hunger and room_food in fixed
+            point, alive, location, trust, and action_counts indexed by code
+        """
+        to_numpy = self.ops.to_numpy
+        return {
+            'hunger': to_numpy(self.hunger),
+            'alive': to_numpy(self.alive),
+            'location': to_numpy(self.location),
+            'trust': to_numpy(self.trust),
+            'room_food': to_numpy(self.room_food),
+            'action_counts': to_numpy(self.action_counts).reshape(self.n_worlds, -1),
+        }
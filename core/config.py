@@ -1,29 +1,37 @@
+import functools
 import yaml
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
-@dataclass
+from core.sim_kernel import SCALE
+
+# libyaml's C parser when PyYAML was built with it, else the pure-Python one
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+@dataclass(slots=True)
 class LoggingConfig:
     """Configuration for simulation logging."""
     enabled: bool = True
     output_dir: str = "logs"
-    formats: List[str] = None  # Will default to ["json", "csv"]
+    formats: List[str] = None  # Any of "json", "json_columns", "ndjson", "csv", "parquet"; defaults to ["json", "csv"]
     log_interval: int = 1  # Log every N steps
+    verbose_stdout: bool = True  # Show per-step progress on the console
     
     def __post_init__(self):
         if self.formats is None:
             self.formats = ["json", "csv"]
 
 
-@dataclass
+@dataclass(slots=True)
 class SimulationConfig:
     """Configuration for simulation runtime."""
     steps: int = 50
     seed: Optional[int] = None
+    device: Optional[str] = None  # Batch backend for --worlds: "numpy" or a torch device such as "cuda"
 
 
-@dataclass
+@dataclass(slots=True)
 class EnvironmentConfig:
     """Configuration for environment parameters."""
     food_regen_rate: float = 0.05
@@ -32,7 +40,7 @@ class EnvironmentConfig:
     trust_increase: float = 0.05
 
 
-@dataclass
+@dataclass(slots=True)
 class RoomConfig:
     """Configuration for a single room."""
     id: int
@@ -41,7 +49,7 @@ class RoomConfig:
     initial_food: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentConfig:
     """Configuration for a single agent."""
     id: int
@@ -49,7 +57,7 @@ class AgentConfig:
     initial_hunger: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Config:
     """Complete simulation configuration."""
     simulation: SimulationConfig
@@ -83,7 +91,7 @@ def load_config(config_path: str = "config/parameters.yaml") -> Config:
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     
     with open(path, 'r') as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=_YAML_LOADER)
     
     if not data:
         raise ValueError(f"Empty or invalid configuration file: {config_path}")
@@ -92,7 +100,8 @@ def load_config(config_path: str = "config/parameters.yaml") -> Config:
     sim_data = data.get('simulation', {})
     simulation = SimulationConfig(
         steps=sim_data.get('steps', 50),
-        seed=sim_data.get('seed')
+        seed=sim_data.get('seed'),
+        device=sim_data.get('device')
     )
     
     # Parse environment config
@@ -133,7 +142,8 @@ def load_config(config_path: str = "config/parameters.yaml") -> Config:
         enabled=logging_data.get('enabled', True),
         output_dir=logging_data.get('output_dir', 'logs'),
         formats=logging_data.get('formats', ['json', 'csv']),
-        log_interval=logging_data.get('log_interval', 1)
+        log_interval=logging_data.get('log_interval', 1),
+        verbose_stdout=logging_data.get('verbose_stdout', True)
     )
     
     return Config(
@@ -161,19 +171,24 @@ def validate_config(config: Config) -> List[str]:
     room_ids = [r.id for r in config.rooms]
     if len(room_ids) != len(set(room_ids)):
         errors.append("Room IDs must be unique")
+    elif sorted(room_ids) != list(range(len(room_ids))):
+        errors.append("Room IDs must be sequential, starting from 0")
+    room_id_set = set(room_ids)
     
     for room in config.rooms:
         for connected_id in room.connected_to:
-            if connected_id not in room_ids:
+            if connected_id not in room_id_set:
                 errors.append(f"Room {room.id} connects to non-existent room {connected_id}")
     
-    # Check agent IDs are unique
+    # Check agent IDs are unique and sequential
     agent_ids = [a.id for a in config.agents]
     if len(agent_ids) != len(set(agent_ids)):
         errors.append("Agent IDs must be unique")
+    elif sorted(agent_ids) != list(range(len(agent_ids))):
+        errors.append("Agent IDs must be sequential, starting from 0")
     
     for agent in config.agents:
-        if agent.location not in room_ids:
+        if agent.location not in room_id_set:
             errors.append(f"Agent {agent.id} starts in non-existent room {agent.location}")
     
     if config.environment.food_regen_rate < 0:
@@ -185,7 +200,52 @@ def validate_config(config: Config) -> List[str]:
     if config.environment.eat_amount <= 0:
         errors.append("Eat amount must be positive")
     
+    # Hunger and food are stored in steps of 1/SCALE, so the rates must be too
+    rates = [
+        ("Food regeneration rate", config.environment.food_regen_rate),
+        ("Hunger increase rate", config.environment.hunger_increase_rate),
+        ("Eat amount", config.environment.eat_amount),
+    ]
+    for name, rate in rates:
+        if abs(rate * SCALE - round(rate * SCALE)) > 1e-6:
+            errors.append(f"{name} must be a multiple of 1/{SCALE} (got {rate})")
+    
     if config.simulation.steps <= 0:
         errors.append("Number of simulation steps must be positive")
     
     return errors
+
+
+@functools.lru_cache(maxsize=8)
+def _load_validated(config_path: str, mtime_ns: int, size: int) -> Tuple[Config, Tuple[str, ...]]:
+    """Load and validate a config file; mtime_ns and size are only part of the cache key."""
+    config = load_config(config_path)
+    return config, tuple(validate_config(config))
+
+
+def load_config_cached(config_path: str = "config/parameters.yaml") -> Tuple[Config, List[str]]:
+    """
+    Load and validate a configuration, reusing the result while the file is unchanged.
+    
+    Results are cached per resolved path, modification time and size, so repeated
+    runs in one process skip both parsing and validation. The returned Config
+    is shared between callers and should not be modified.
+    
+    Args:
+        config_path: Path to the YAML configuration file
+        
+    Returns:
+        (config, errors) where errors is the validate_config result
+        
+    Raises:
+        FileNotFoundError: If config file doesn't exist
+        ValueError: If config file is invalid
+    """
+    path = Path(config_path)
+    
+    if not path.exists():
+        raise FileNotFoundError(f"Configuration file not found: {config_path}")
+    
+    stat = path.stat()
+    config, errors = _load_validated(str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    return config, list(errors)
@@ -1,92 +1,312 @@
-from core import room, agent, actions
-from typing import Dict, List, Optional, TYPE_CHECKING
+from core import room, agent, actions, sim_kernel
+from core.config import Config, EnvironmentConfig
+import numpy as np
+from typing import List, Optional, Union, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from core.logger import SimulationLogger
 
+
 class Environment:
     """Manages the simulation environment with rooms and agents."""
     
-    def __init__(self, rooms: Dict[int, room.Room], agents: List[agent.Agent], 
-                 logger: Optional['SimulationLogger'] = None):
-        self.rooms = rooms
-        self.agents = agents
+    def __init__(self, rooms: List[room.Room], agents: List[agent.Agent], 
+                 logger: Optional['SimulationLogger'] = None,
+                 rng: Union[int, np.random.Generator, None] = None,
+                 params: Optional[EnvironmentConfig] = None,
+                 compile_kernel: bool = True):
+        # Rooms and agents are fixed for the run, so keep them as tuples
+        self.rooms = tuple(rooms)
+        self.agents = tuple(agents)
         self.logger = logger
+        # A seed or an existing Generator; default_rng passes a Generator through
+        self.rng = np.random.default_rng(rng)
+        self._init_rates(params if params is not None else EnvironmentConfig(), compile_kernel)
+        self._init_arrays()
         self._update_room_agents()
+
+    @classmethod
+    def from_config(cls, config: Config, logger: Optional['SimulationLogger'] = None,
+                    rng: Optional[np.random.Generator] = None,
+                    compile_kernel: bool = True) -> 'Environment':
+        """
+        Build an environment straight from a loaded configuration.
+        
+        Args:
+            config: Validated simulation configuration
+            logger: Optional logger to record each step
+            rng: Random generator to draw from (default: seeded from config.simulation.seed)
+            compile_kernel: Build the Numba step kernel when available; with False
+                every step runs on the NumPy path
+            
+        Returns:
+            Environment holding the configured rooms and agents
+        """
+        if rng is None:
+            rng = np.random.default_rng(config.simulation.seed)
+        rooms = [
+            room.Room(
+                id=room_config.id,
+                capacity=room_config.capacity if room_config.capacity > 0 else 1,
+                connectedRooms=room_config.connected_to,
+                food=room_config.initial_food
+            )
+            for room_config in sorted(config.rooms, key=lambda r: r.id)
+        ]
+        agents = [
+            agent.Agent(
+                id=agent_config.id,
+                location=agent_config.location,
+                hunger=agent_config.initial_hunger
+            )
+            for agent_config in sorted(config.agents, key=lambda a: a.id)
+        ]
+        return cls(rooms, agents, logger=logger, rng=rng, params=config.environment,
+                   compile_kernel=compile_kernel)
+
+    def _init_rates(self, params: EnvironmentConfig, compile_kernel: bool = True):
+        """
+        Convert the per-step rates to fixed point and specialize the kernel on them.
+        
+        The rates never change during a run, so the compiled kernel is built
+        with them as constants (see sim_kernel.make_step_kernel).
+        """
+        self.eat_amount = int(self._quantize([params.eat_amount])[0])
+        self.hunger_step = int(self._quantize([params.hunger_increase_rate])[0])
+        self.food_regen = int(self._quantize([params.food_regen_rate])[0])
+        # Trust is float32, and every step path adds this in float32 arithmetic
+        self.trust_increase = np.float32(params.trust_increase)
+
+        self._kernel = None
+        if compile_kernel and sim_kernel.NUMBA_AVAILABLE:
+            self._kernel = sim_kernel.make_step_kernel(
+                self.eat_amount, self.hunger_step, self.food_regen, self.trust_increase,
+                parallel=len(self.agents) >= sim_kernel.PARALLEL_MIN_AGENTS
+            )
+
+    def _init_arrays(self):
+        """Move agent and room state into parallel arrays indexed by id.
+
+        Agent and Room objects become thin views onto these arrays, so the
+        per-step updates can run as vectorized operations.
+        """
+        if [a.id for a in self.agents] != list(range(len(self.agents))):
+            raise ValueError("Agent IDs must be 0..N-1 in list order")
+        if [r.id for r in self.rooms] != list(range(len(self.rooms))):
+            raise ValueError("Room IDs must be 0..R-1 in list order")
+
+        n_agents, n_rooms = len(self.agents), len(self.rooms)
+        self.hunger = self._quantize(np.fromiter((a.hunger for a in self.agents), np.float64, n_agents))
+        self.alive = np.fromiter((a.alive for a in self.agents), bool, n_agents)
+        self.location = np.fromiter((a.location for a in self.agents), np.int32, n_agents)
+        self.trust = np.zeros((n_agents, n_agents), np.float32)
+        self.room_food = self._quantize(np.fromiter((r.food for r in self.rooms), np.float64, n_rooms))
+        self.room_capacity = np.fromiter((r.capacity for r in self.rooms), np.int32, n_rooms)
+        self._init_graph(self.rooms)
+
+        for agent in self.agents:
+            agent.bind(self)
+        for room in self.rooms:
+            room.bind(self)
     
+    @staticmethod
+    def _quantize(values) -> np.ndarray:
+        """Convert values in [0, 1] to uint8 fixed point (see sim_kernel.SCALE)."""
+        scaled = np.rint(np.asarray(values, np.float64) * sim_kernel.SCALE)
+        return np.clip(scaled, 0, sim_kernel.SCALE).astype(np.uint8)
+
+    def _init_graph(self, room_list: List[room.Room]):
+        """
+        Flatten room connectivity into CSR arrays.
+
+        The neighbors of room r are conn_indices[conn_offsets[r]:conn_offsets[r + 1]],
+        sorted so membership can be tested with a binary search.
+        """
+        # Read every room's connections before replacing the arrays they may come from
+        neighbors = [sorted(r.connectedRooms) for r in room_list]
+        conn_offsets = np.zeros(len(room_list) + 1, np.int32)
+        np.cumsum([len(n) for n in neighbors], out=conn_offsets[1:])
+        self.conn_indices = np.fromiter(
+            (n for room_neighbors in neighbors for n in room_neighbors),
+            np.int32, count=int(conn_offsets[-1])
+        )
+        self.conn_offsets = conn_offsets
+
+    def _is_connected(self, src: int, dst: int) -> bool:
+        """Check whether dst is a neighbor of src."""
+        start, end = self.conn_offsets[src], self.conn_offsets[src + 1]
+        pos = start + np.searchsorted(self.conn_indices[start:end], dst)
+        return pos < end and self.conn_indices[pos] == dst
+
     def _update_room_agents(self):
-        """Update which agents are in which rooms."""
+        """Rebuild which agents are in which rooms from scratch."""
         # Clear all room agent lists
-        for room in self.rooms.values():
+        for room in self.rooms:
             room.agents.clear()
         
         # Add agents to their current rooms
         for agent in self.agents:
             if agent.alive:
                 self.rooms[agent.location].agents.append(agent.id)
-    
-    def step(self):
-        """Execute one simulation step."""
-        action_decisions = {}
 
-        # Collect actions from all agents
-        for agent in self.agents:
-            if not agent.alive:
-                continue
-            current_room = self.rooms[agent.location]
-            action = agent.decide(current_room)
-            action_decisions[agent.id] = action
-
-        # Resolve actions
-        for agent in self.agents:
-            if not agent.alive:
-                continue
-                
-            action, params = action_decisions[agent.id]
-            current_room = self.rooms[agent.location]
-            
-            if action == actions.Action.EAT:
-                eaten = min(0.3, current_room.food)
-                current_room.food -= eaten
-                agent.hunger = max(0.0, agent.hunger - eaten)  # Reduce hunger
-            
-            elif action == actions.Action.MOVE and params is not None:
-                if params in current_room.connectedRooms:
-                    target_room = self.rooms[params]
-                    if len(target_room.agents) < target_room.capacity:
-                        agent.location = params
-                    
-            
-            elif action == actions.Action.TALK and params is not None:
-                agent.trust[params] = round(agent.trust.get(params, 0.0) + 0.05, 2)
-                agent.trust[params] = min(1.0, agent.trust[params])
+        self.room_agent_count = np.bincount(
+            self.location[self.alive], minlength=len(self.rooms)
+        ).astype(np.int32)
 
-        self._update_room_agents()
-
-        # Regenerate food in all rooms
-        for room in self.rooms.values():
-            room.food = min(1.0, room.food + 0.05)
+    def _move_agent(self, agent_id: int, src: int, dst: int):
+        """Move an agent between rooms, updating only the two rooms involved."""
+        self.location[agent_id] = dst
+        self.rooms[src].agents.remove(agent_id)
+        self.rooms[dst].agents.append(agent_id)
+        self.room_agent_count[src] -= 1
+        self.room_agent_count[dst] += 1
+    
+    def step(self):
+        """
+        Execute one simulation step.
         
-        for agent in self.agents:
-            if agent.alive:
-                current_room = self.rooms[agent.location]
-                occupancy_ratio = len(current_room.agents) / current_room.capacity
-                
-                hunger_increase = 0.05
-                
-                if occupancy_ratio > 0.75: 
-                    overcrowding_penalty = (occupancy_ratio - 0.75) * 0.1  
-                    hunger_increase += overcrowding_penalty
-                
-                agent.hunger = min(1.0, agent.hunger + hunger_increase)
+        Returns:
+            (codes, targets) aligned with self.agents: codes is int8[N] of
+            action codes (-1 for dead agents), targets is int32[N] (-1 when
+            the action has no target)
+        """
+        # Draw all of this step's randomness up front, indexed by agent id
+        n_agents = len(self.agents)
+        talk_draws = self.rng.random(n_agents)
+        move_draws = self.rng.random(n_agents)
+
+        if self._kernel is not None:
+            codes, targets = self._step_compiled(talk_draws, move_draws)
+        else:
+            codes, targets = self._step_python(talk_draws, move_draws)
 
         # Log this step if logger is enabled
         if self.logger:
             self.logger.log_step(
                 timestep=getattr(self, '_current_step', 0),
-                agents=self.agents,
-                rooms=self.rooms,
-                action_decisions=action_decisions
+                env=self,
+                codes=codes,
+                targets=targets
             )
         
-        return action_decisions
\ No newline at end of file
+        return codes, targets
+
+    def step_with_actions(self):
+        """
+        Execute one simulation step and decode its actions.
+        
+        Returns:
+            Dictionary mapping each living agent's id to (Action, target),
+            with target None when the action has none
+        """
+        codes, targets = self.step()
+        action_decisions = {}
+        for agent_id, (code, target) in enumerate(zip(codes.tolist(), targets.tolist())):
+            if code >= 0:
+                action_decisions[agent_id] = (actions.Action(code), target if target >= 0 else None)
+        return action_decisions
+
+    def _decide_all(self, talk_draws: np.ndarray, move_draws: np.ndarray):
+        """
+        Decide every agent's action at once from the state at the start of the step.
+
+        Each priority rule is evaluated as a boolean mask over all agents and
+        np.select picks the first rule that holds.
+
+        Returns:
+            (codes, targets) where codes is int8[N] (-1 for dead agents) and
+            targets is int32[N] (-1 when the action has no target)
+        """
+        n_agents = len(self.agents)
+        n_rooms = len(self.rooms)
+        location = self.location
+        alive = self.alive
+
+        hunger = self.hunger
+        food_at = self.room_food[location]
+        room_agent_count = self.room_agent_count
+        in_room = room_agent_count[location]
+        degree = np.diff(self.conn_offsets)[location]
+
+        m_eat = (hunger > sim_kernel.HUNGRY) & (food_at > sim_kernel.FOOD_ENOUGH)
+        m_move_hungry = (hunger > sim_kernel.STARVING) & (food_at < sim_kernel.FOOD_LOW) & (degree > 0)
+        m_talk = in_room > 1
+        m_move = degree > 0
+        m_eat_leftover = food_at > 0
+        codes = np.select(
+            [m_eat, m_move_hungry, m_talk, m_move, m_eat_leftover],
+            [actions.EAT, actions.MOVE, actions.TALK, actions.MOVE, actions.EAT],
+            default=actions.TALK
+        ).astype(np.int8)
+        codes[~alive] = -1
+        targets = np.full(n_agents, -1, np.int32)
+
+        # Move to a random neighbor
+        move = codes == actions.MOVE
+        pick = (move_draws[move] * degree[move]).astype(np.int32)
+        targets[move] = self.conn_indices[self.conn_offsets[location[move]] + pick]
+
+        # Talk to a random other agent in the room; living agents are grouped
+        # by room in id order, so skip over the talker's own slot
+        talk = (codes == actions.TALK) & m_talk
+        members = np.argsort(np.where(alive, location, n_rooms), kind='stable')
+        room_start = np.zeros(n_rooms + 1, np.int64)
+        np.cumsum(room_agent_count, out=room_start[1:])
+        rank = np.empty(n_agents, np.int64)
+        rank[members] = np.arange(n_agents)
+        rank -= room_start[location]
+        pick = (talk_draws[talk] * (in_room[talk] - 1)).astype(np.int64)
+        pick += pick >= rank[talk]
+        targets[talk] = members[room_start[location[talk]] + pick]
+
+        return codes, targets
+
+    def _step_compiled(self, talk_draws: np.ndarray, move_draws: np.ndarray):
+        """Run one step through the compiled kernel."""
+        previous = self.location.copy()
+        codes, targets = self._kernel(
+            self.hunger, self.alive, self.location, self.trust, self.room_food,
+            self.room_capacity, self.room_agent_count, self.conn_offsets, self.conn_indices,
+            talk_draws, move_draws
+        )
+
+        # The kernel already updated locations and counts; sync the room lists
+        for agent_id in np.flatnonzero(self.location != previous).tolist():
+            self.rooms[int(previous[agent_id])].agents.remove(agent_id)
+            self.rooms[int(self.location[agent_id])].agents.append(agent_id)
+        return codes, targets
+
+    def _step_python(self, talk_draws: np.ndarray, move_draws: np.ndarray):
+        """Run one step with NumPy and Python, used when Numba is not installed."""
+        codes, targets = self._decide_all(talk_draws, move_draws)
+
+        # Moves are checked against occupancy at the start of the step
+        occupancy = self.room_agent_count.copy()
+
+        # Resolve actions
+        for agent, code, target in zip(self.agents, codes.tolist(), targets.tolist()):
+            if code == actions.EAT:
+                room_id = agent.location
+                eaten = min(self.eat_amount, int(self.room_food[room_id]))
+                self.room_food[room_id] -= eaten
+                self.hunger[agent.id] = max(0, int(self.hunger[agent.id]) - eaten)  # Reduce hunger
+            
+            elif code == actions.MOVE:
+                if self._is_connected(agent.location, target):
+                    if occupancy[target] < self.room_capacity[target]:
+                        self._move_agent(agent.id, agent.location, target)
+            
+            elif code == actions.TALK and target >= 0:
+                self.trust[agent.id, target] = min(1.0, self.trust[agent.id, target] + self.trust_increase)
+        # Regenerate food in all rooms, saturating at SCALE
+        self.room_food[:] = np.minimum(
+            self.room_food.astype(np.uint16) + self.food_regen, sim_kernel.SCALE
+        )
+
+        # Hunger increase, with a penalty in overcrowded rooms
+        penalty = sim_kernel.overcrowding_penalties(self.room_agent_count, self.room_capacity)
+        hunger_increase = self.hunger_step + penalty[self.location]
+        alive = self.alive
+        self.hunger[alive] = np.minimum(self.hunger[alive] + hunger_increase[alive], sim_kernel.SCALE)
+
+        return codes, targets
@@ -2,12 +2,35 @@
 
 import json
 import csv
+import numpy as np
 from pathlib import Path
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields
 from typing import List, Dict, Optional, Any
 from datetime import datetime
+from core.actions import Action
+from core.sim_kernel import SCALE
 
-@dataclass
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Write buffer for exports, so records reach the OS in large chunks
+_WRITE_BUFFER = 1 << 20
+
+# Action names indexed by action code, resolved once instead of per record
+_ACTION_NAMES = tuple(Action(code).name for code in range(len(Action)))
+
+
+def _dataclass_fields(obj: Any) -> Dict[str, Any]:
+    """Shallow field mapping for json.dump; nested dataclasses are visited lazily."""
+    try:
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    except TypeError:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@dataclass(slots=True)
 class AgentState:
     """Snapshot of an agent's state at a specific timestep."""
     id: int
@@ -17,7 +40,7 @@ class AgentState:
     trust: Dict[int, float]
 
 
-@dataclass
+@dataclass(slots=True)
 class RoomState:
     """Snapshot of a room's state at a specific timestep."""
     id: int
@@ -26,7 +49,7 @@ class RoomState:
     agents: List[int]
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionRecord:
     """Record of an action taken by an agent."""
     agent_id: int
@@ -34,7 +57,7 @@ class ActionRecord:
     target: Optional[int]
 
 
-@dataclass
+@dataclass(slots=True)
 class StepLog:
     """Complete log of a single simulation step."""
     timestep: int
@@ -43,7 +66,7 @@ class StepLog:
     actions: List[ActionRecord]
 
 
-@dataclass
+@dataclass(slots=True)
 class SimulationMetadata:
     """Metadata about the simulation run."""
     timestamp: str
@@ -54,7 +77,14 @@ class SimulationMetadata:
 
 
 class SimulationLogger:
-    """Tracks and exports simulation data for analysis."""
+    """Tracks and exports simulation data for analysis.
+
+    Snapshots are copied into preallocated (steps, agents) and (steps, rooms)
+    NumPy arrays, one row per logged step, rather than per-step Python
+    objects. Hunger and food keep the Environment's uint8 fixed-point
+    encoding and trust is only rounded on export. Per-step records are only
+    rebuilt when exporting.
+    """
     
     def __init__(self, output_dir: str = "logs", enabled: bool = True, log_interval: int = 1):
         """
@@ -68,9 +98,18 @@ class SimulationLogger:
         self.enabled = enabled
         self.log_interval = log_interval
         self.output_dir = Path(output_dir)
-        self.steps: List[StepLog] = []
         self.metadata: Optional[SimulationMetadata] = None
         
+        # Columnar storage, allocated on the first logged step
+        self._n_logged = 0
+        self._n_agents = 0
+        self._n_rooms = 0
+        self._step_log: Dict[str, np.ndarray] = {}
+        self._action_counts = np.zeros(len(_ACTION_NAMES), np.int64)
+        self._agent_log: Dict[str, np.ndarray] = {}
+        self._room_log: Dict[str, np.ndarray] = {}
+        self._trust_log: List[tuple] = []
+        
         if self.enabled:
             self.output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -84,62 +123,195 @@ class SimulationLogger:
             seed=seed
         )
     
-    def log_step(self, timestep: int, agents: List[Any], rooms: Dict[int, Any], 
-                 action_decisions: Dict[int, tuple]):
+    def _reserve(self, n_agents: int, n_rooms: int):
+        """Make room for one more snapshot, allocating or doubling the columns."""
+        if not self._agent_log:
+            if self.metadata is not None:
+                capacity = len(range(0, self.metadata.total_steps, self.log_interval))
+            else:
+                capacity = 64
+            capacity = max(capacity, 1)
+            self._n_agents = n_agents
+            self._n_rooms = n_rooms
+            location_dtype = np.int16 if n_rooms <= np.iinfo(np.int16).max else np.int32
+            # Per-step aggregates kept up to date for generate_summary
+            self._step_log = {
+                'timestep': np.empty(capacity, np.int32),
+                'alive_count': np.empty(capacity, np.int32),
+                'hunger_sum': np.empty(capacity, np.int64),
+                'food_sum': np.empty(capacity, np.int64),
+            }
+            self._agent_log = {
+                'location': np.empty((capacity, n_agents), location_dtype),
+                'hunger': np.empty((capacity, n_agents), np.uint8),
+                'alive': np.empty((capacity, n_agents), bool),
+                'action': np.empty((capacity, n_agents), np.int8),
+                'target': np.empty((capacity, n_agents), np.int32),
+            }
+            self._room_log = {
+                'food': np.empty((capacity, n_rooms), np.uint8),
+                'agent_count': np.empty((capacity, n_rooms), np.int32),
+            }
+        elif self._n_logged == len(self._step_log['timestep']):
+            capacity = 2 * len(self._step_log['timestep'])
+            for log in (self._step_log, self._agent_log, self._room_log):
+                for name, column in log.items():
+                    log[name] = np.resize(column, (capacity,) + column.shape[1:])
+    
+    def log_step(self, timestep: int, env: Any, codes: np.ndarray, targets: np.ndarray):
         """
         Log data for a single simulation step.
         
         Args:
             timestep: Current simulation timestep
-            agents: List of Agent objects
-            rooms: Dictionary of Room objects
-            action_decisions: Dictionary mapping agent_id to (action, target) tuples
+            env: Environment whose state arrays are snapshotted
+            codes: Action code chosen by each agent (-1 for dead agents)
+            targets: Target of each agent's action (-1 when there is none)
         """
         if not self.enabled or timestep % self.log_interval != 0:
             return
         
-        # Log agent states
-        agent_states = [
-            AgentState(
-                id=agent.id,
-                location=agent.location,
-                hunger=round(agent.hunger, 3),
-                alive=agent.alive,
-                trust={k: round(v, 3) for k, v in agent.trust.items()}
-            )
-            for agent in agents
-        ]
+        self._reserve(len(env.hunger), len(env.room_food))
+        k = self._n_logged
+        
+        self._step_log['timestep'][k] = timestep
+        self._agent_log['location'][k] = env.location
+        self._agent_log['hunger'][k] = env.hunger
+        self._agent_log['alive'][k] = env.alive
+        self._agent_log['action'][k] = codes
+        self._agent_log['target'][k] = targets
+        self._room_log['food'][k] = env.room_food
+        self._room_log['agent_count'][k] = env.room_agent_count
+        
+        self._step_log['alive_count'][k] = np.count_nonzero(env.alive)
+        self._step_log['hunger_sum'][k] = env.hunger.sum(where=env.alive, dtype=np.int64)
+        self._step_log['food_sum'][k] = env.room_food.sum(dtype=np.int64)
+        self._action_counts += np.bincount(codes[codes >= 0], minlength=len(_ACTION_NAMES))
+        
+        # Trust is sparse in practice, so keep only the non-zero entries
+        agent_ids, other_ids = np.nonzero(env.trust)
+        self._trust_log.append((
+            agent_ids.astype(np.int32), other_ids.astype(np.int32), env.trust[agent_ids, other_ids]
+        ))
+        
+        self._n_logged += 1
+    
+    def _agent_columns(self) -> Dict[str, np.ndarray]:
+        """Per-agent rows for every logged step."""
+        n, width = self._n_logged, self._n_agents
+        columns = {
+            'timestep': np.repeat(self._step_log['timestep'][:n], width),
+            'agent_id': np.tile(np.arange(width, dtype=np.int32), n),
+        }
+        columns.update({name: column[:n].ravel() for name, column in self._agent_log.items()})
+        return columns
+    
+    def _room_columns(self) -> Dict[str, np.ndarray]:
+        """Per-room rows for every logged step."""
+        n, width = self._n_logged, self._n_rooms
+        columns = {
+            'timestep': np.repeat(self._step_log['timestep'][:n], width),
+            'room_id': np.tile(np.arange(width, dtype=np.int32), n),
+        }
+        columns.update({name: column[:n].ravel() for name, column in self._room_log.items()})
+        return columns
+    
+    def _trust_columns(self) -> Dict[str, np.ndarray]:
+        """Non-zero trust entries for every logged step."""
+        sizes = [len(values) for _, _, values in self._trust_log]
+        return {
+            'timestep': np.repeat(self._step_log['timestep'][:self._n_logged], sizes),
+            'agent_id': np.concatenate([a for a, _, _ in self._trust_log] or [np.empty(0, np.int32)]),
+            'other_id': np.concatenate([o for _, o, _ in self._trust_log] or [np.empty(0, np.int32)]),
+            'trust': np.concatenate([v for _, _, v in self._trust_log] or [np.empty(0, np.float32)]),
+        }
+    
+    def _tables(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Agents, rooms, actions and trust tables as NumPy columns.
         
-        # Log room states
-        room_states = [
-            RoomState(
-                id=room_id,
-                food=round(room.food, 3),
-                agent_count=len(room.agents),
-                agents=list(room.agents)
-            )
-            for room_id, room in rooms.items()
-        ]
+        Hunger and food are converted from fixed point to real values.
+        Actions hold action codes, with a target of -1 when there is none.
+        """
+        agent_columns = self._agent_columns()
+        room_columns = self._room_columns()
+        acted = agent_columns['action'] >= 0
         
-        # Log actions
-        action_records = [
-            ActionRecord(
-                agent_id=agent_id,
-                action=action.name,
-                target=target
-            )
-            for agent_id, (action, target) in action_decisions.items()
-        ]
+        agent_columns['hunger'] = (agent_columns['hunger'] / SCALE).astype(np.float32)
+        room_columns['food'] = (room_columns['food'] / SCALE).astype(np.float32)
         
-        # Create step log
-        step_log = StepLog(
-            timestep=timestep,
-            agents=agent_states,
-            rooms=room_states,
-            actions=action_records
-        )
+        return {
+            'agents': {
+                name: agent_columns[name]
+                for name in ('timestep', 'agent_id', 'location', 'hunger', 'alive')
+            },
+            'rooms': room_columns,
+            'actions': {
+                'timestep': agent_columns['timestep'][acted],
+                'agent_id': agent_columns['agent_id'][acted],
+                'action': agent_columns['action'][acted],
+                'target': agent_columns['target'][acted],
+            },
+            'trust': self._trust_columns(),
+        }
+    
+    def iter_steps(self):
+        """
+        Rebuild per-step records from the columnar log.
         
-        self.steps.append(step_log)
+        Yields:
+            StepLog for each logged step, in order
+        """
+        n_agents, n_rooms = self._n_agents, self._n_rooms
+        for k in range(self._n_logged):
+            location = self._agent_log['location'][k]
+            hunger = self._agent_log['hunger'][k]
+            alive = self._agent_log['alive'][k]
+            codes = self._agent_log['action'][k]
+            targets = self._agent_log['target'][k]
+            food = self._room_log['food'][k]
+            agent_count = self._room_log['agent_count'][k]
+            
+            trust = [{} for _ in range(n_agents)]
+            for agent_id, other_id, value in zip(*(c.tolist() for c in self._trust_log[k])):
+                trust[agent_id][other_id] = round(value, 3)
+            
+            agent_states = [
+                AgentState(
+                    id=agent_id,
+                    location=int(location[agent_id]),
+                    hunger=round(int(hunger[agent_id]) / SCALE, 3),
+                    alive=bool(alive[agent_id]),
+                    trust=trust[agent_id]
+                )
+                for agent_id in range(n_agents)
+            ]
+            
+            room_states = [
+                RoomState(
+                    id=room_id,
+                    food=round(int(food[room_id]) / SCALE, 3),
+                    agent_count=int(agent_count[room_id]),
+                    agents=np.flatnonzero(alive & (location == room_id)).tolist()
+                )
+                for room_id in range(n_rooms)
+            ]
+            
+            action_records = [
+                ActionRecord(
+                    agent_id=agent_id,
+                    action=_ACTION_NAMES[codes[agent_id]],
+                    target=int(targets[agent_id]) if targets[agent_id] >= 0 else None
+                )
+                for agent_id in np.flatnonzero(codes >= 0).tolist()
+            ]
+            
+            yield StepLog(
+                timestep=int(self._step_log['timestep'][k]),
+                agents=agent_states,
+                rooms=room_states,
+                actions=action_records
+            )
     
     def export_json(self, filename: Optional[str] = None) -> Path:
         """
@@ -160,14 +332,50 @@ class SimulationLogger:
         
         filepath = self.output_dir / filename
         
-        # Convert to dictionary
-        data = {
-            "metadata": asdict(self.metadata) if self.metadata else None,
-            "steps": [asdict(step) for step in self.steps]
-        }
+        data = {"metadata": self.metadata, "steps": list(self.iter_steps())}
         
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(filepath, 'w') as f:
+                f.write(json.dumps(data, indent=2, default=_dataclass_fields))
+        
+        return filepath
+    
+    def export_ndjson(self, filename: Optional[str] = None) -> Path:
+        """
+        Export the log as newline-delimited JSON, one step per line.
+        
+        The first line holds the metadata. Steps are encoded one at a time,
+        so long runs never build the whole document in memory.
+        
+        Args:
+            filename: Optional custom filename (default: simulation_TIMESTAMP.ndjson)
+            
+        Returns:
+            Path to the created NDJSON file
+        """
+        if not self.enabled:
+            raise RuntimeError("Logger is disabled, cannot export")
+        
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"simulation_{timestamp}.ndjson"
+        
+        filepath = self.output_dir / filename
+        
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            with open(filepath, 'wb', buffering=_WRITE_BUFFER) as f:
+                f.write(orjson.dumps({"metadata": self.metadata}, option=option))
+                for step in self.iter_steps():
+                    f.write(orjson.dumps(step, option=option))
+        else:
+            with open(filepath, 'w', buffering=_WRITE_BUFFER) as f:
+                f.write(json.dumps({"metadata": self.metadata}, default=_dataclass_fields) + "\n")
+                for step in self.iter_steps():
+                    f.write(json.dumps(step, default=_dataclass_fields) + "\n")
         
         return filepath
     
@@ -189,65 +397,163 @@ class SimulationLogger:
             prefix = f"simulation_{timestamp}"
         
         files = {}
+        agent_columns = self._agent_columns()
         
         # Export agent states
+        trust_strs = [''] * len(agent_columns['agent_id'])
+        for k, (agent_ids, other_ids, values) in enumerate(self._trust_log):
+            for agent_id, other_id, value in zip(agent_ids.tolist(), other_ids.tolist(), values.tolist()):
+                row = k * self._n_agents + agent_id
+                entry = f"{other_id}:{round(value, 3)}"
+                trust_strs[row] = f"{trust_strs[row]};{entry}" if trust_strs[row] else entry
+        
         agent_file = self.output_dir / f"{prefix}_agents.csv"
-        with open(agent_file, 'w', newline='') as f:
+        with open(agent_file, 'w', newline='', buffering=_WRITE_BUFFER) as f:
             writer = csv.writer(f)
             writer.writerow(['timestep', 'agent_id', 'location', 'hunger', 'alive', 'trust_relationships'])
-            
-            for step in self.steps:
-                for agent in step.agents:
-                    trust_str = ';'.join([f"{k}:{v}" for k, v in agent.trust.items()])
-                    writer.writerow([
-                        step.timestep,
-                        agent.id,
-                        agent.location,
-                        agent.hunger,
-                        agent.alive,
-                        trust_str
-                    ])
+            writer.writerows(zip(
+                agent_columns['timestep'].tolist(),
+                agent_columns['agent_id'].tolist(),
+                agent_columns['location'].tolist(),
+                np.round(agent_columns['hunger'] / SCALE, 3).tolist(),
+                agent_columns['alive'].tolist(),
+                trust_strs
+            ))
         
         files['agents'] = agent_file
         
         # Export room states
+        room_columns = self._room_columns()
+        occupants = [
+            ';'.join(map(str, np.flatnonzero(alive & (location == room_id)).tolist()))
+            for location, alive in zip(
+                self._agent_log['location'][:self._n_logged],
+                self._agent_log['alive'][:self._n_logged]
+            )
+            for room_id in range(self._n_rooms)
+        ]
+        
         room_file = self.output_dir / f"{prefix}_rooms.csv"
-        with open(room_file, 'w', newline='') as f:
+        with open(room_file, 'w', newline='', buffering=_WRITE_BUFFER) as f:
             writer = csv.writer(f)
             writer.writerow(['timestep', 'room_id', 'food', 'agent_count', 'agents'])
-            
-            for step in self.steps:
-                for room in step.rooms:
-                    agents_str = ';'.join(map(str, room.agents))
-                    writer.writerow([
-                        step.timestep,
-                        room.id,
-                        room.food,
-                        room.agent_count,
-                        agents_str
-                    ])
+            writer.writerows(zip(
+                room_columns['timestep'].tolist(),
+                room_columns['room_id'].tolist(),
+                np.round(room_columns['food'] / SCALE, 3).tolist(),
+                room_columns['agent_count'].tolist(),
+                occupants
+            ))
         
         files['rooms'] = room_file
         
         # Export actions
+        acted = agent_columns['action'] >= 0
+        action_names = [_ACTION_NAMES[code] for code in agent_columns['action'][acted].tolist()]
+        
         action_file = self.output_dir / f"{prefix}_actions.csv"
-        with open(action_file, 'w', newline='') as f:
+        with open(action_file, 'w', newline='', buffering=_WRITE_BUFFER) as f:
             writer = csv.writer(f)
             writer.writerow(['timestep', 'agent_id', 'action', 'target'])
-            
-            for step in self.steps:
-                for action in step.actions:
-                    writer.writerow([
-                        step.timestep,
-                        action.agent_id,
-                        action.action,
-                        action.target if action.target is not None else ''
-                    ])
+            writer.writerows(
+                (timestep, agent_id, action, target if target >= 0 else '')
+                for timestep, agent_id, action, target in zip(
+                    agent_columns['timestep'][acted].tolist(),
+                    agent_columns['agent_id'][acted].tolist(),
+                    action_names,
+                    agent_columns['target'][acted].tolist()
+                )
+            )
         
         files['actions'] = action_file
         
         return files
     
+    def export_parquet(self, prefix: Optional[str] = None) -> Dict[str, Path]:
+        """
+        Export logs to Parquet files (agents, rooms, actions and trust tables).
+        
+        Requires pyarrow.
+        
+        Args:
+            prefix: Optional prefix for filenames (default: simulation_TIMESTAMP)
+            
+        Returns:
+            Dictionary mapping table name to filepath
+        """
+        if not self.enabled:
+            raise RuntimeError("Logger is disabled, cannot export")
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("pyarrow is required for Parquet export") from e
+        
+        if prefix is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            prefix = f"simulation_{timestamp}"
+        
+        tables = self._tables()
+        actions = tables['actions']
+        actions['action'] = np.array(_ACTION_NAMES)[actions['action']]
+        actions['target'] = pa.array(actions['target'], mask=actions['target'] < 0)
+        
+        files = {}
+        for name, columns in tables.items():
+            filepath = self.output_dir / f"{prefix}_{name}.parquet"
+            pq.write_table(pa.table(columns), filepath)
+            files[name] = filepath
+        
+        return files
+    
+    def export_json_columns(self, filename: Optional[str] = None) -> Path:
+        """
+        Export the agents, rooms, actions and trust tables as columnar JSON.
+        
+        Each table is an object of equal-length column arrays, written
+        straight from the NumPy columns. Actions are stored as codes, named
+        by "action_names"; a target of -1 means the action had none.
+        
+        Args:
+            filename: Optional custom filename (default: simulation_TIMESTAMP_columns.json)
+            
+        Returns:
+            Path to the created JSON file
+        """
+        if not self.enabled:
+            raise RuntimeError("Logger is disabled, cannot export")
+        
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"simulation_{timestamp}_columns.json"
+        
+        filepath = self.output_dir / filename
+        
+        # Round real values the same way as the other exports
+        tables = {
+            table: {
+                name: np.round(column.astype(np.float64), 3) if column.dtype.kind == 'f' else column
+                for name, column in columns.items()
+            }
+            for table, columns in self._tables().items()
+        }
+        
+        if orjson is not None:
+            data = {"metadata": self.metadata, "action_names": _ACTION_NAMES, **tables}
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            tables = {
+                table: {name: column.tolist() for name, column in columns.items()}
+                for table, columns in tables.items()
+            }
+            data = {"metadata": self.metadata, "action_names": _ACTION_NAMES, **tables}
+            with open(filepath, 'w') as f:
+                f.write(json.dumps(data, default=_dataclass_fields))
+        
+        return filepath
+    
     def generate_summary(self) -> Dict[str, Any]:
         """
         Generate summary statistics from logged data.
@@ -255,47 +561,39 @@ class SimulationLogger:
         Returns:
             Dictionary containing summary statistics
         """
-        if not self.steps:
+        if not self._n_logged:
             return {}
         
-        # Calculate average hunger over time
-        avg_hunger_per_step = []
-        for step in self.steps:
-            alive_agents = [a for a in step.agents if a.alive]
-            if alive_agents:
-                avg_hunger = sum(a.hunger for a in alive_agents) / len(alive_agents)
-                avg_hunger_per_step.append(avg_hunger)
-        
-        # Calculate average food per room over time
-        avg_food_per_step = []
-        for step in self.steps:
-            avg_food = sum(r.food for r in step.rooms) / len(step.rooms)
-            avg_food_per_step.append(avg_food)
-        
-        # Count action types
-        action_counts = {}
-        for step in self.steps:
-            for action in step.actions:
-                action_counts[action.action] = action_counts.get(action.action, 0) + 1
+        n = self._n_logged
+        alive_counts = self._step_log['alive_count'][:n]
+        has_alive = alive_counts > 0
+        
+        # Average hunger of living agents, and average food per room, per step
+        avg_hunger_per_step = self._step_log['hunger_sum'][:n][has_alive] / alive_counts[has_alive] / SCALE
+        avg_food_per_step = self._step_log['food_sum'][:n] / (self._n_rooms * SCALE)
+        
+        action_counts = {
+            _ACTION_NAMES[code]: int(count)
+            for code, count in enumerate(self._action_counts.tolist()) if count
+        }
         
         # Calculate survival rate
-        final_step = self.steps[-1]
-        alive_count = sum(1 for a in final_step.agents if a.alive)
-        total_agents = len(final_step.agents)
+        alive_count = int(alive_counts[-1])
+        total_agents = self._n_agents
         
         return {
-            "total_steps_logged": len(self.steps),
+            "total_steps_logged": n,
             "avg_hunger": {
-                "mean": sum(avg_hunger_per_step) / len(avg_hunger_per_step),
-                "min": min(avg_hunger_per_step),
-                "max": max(avg_hunger_per_step),
-                "final": avg_hunger_per_step[-1]
+                "mean": float(avg_hunger_per_step.mean()),
+                "min": float(avg_hunger_per_step.min()),
+                "max": float(avg_hunger_per_step.max()),
+                "final": float(avg_hunger_per_step[-1])
             },
             "avg_food": {
-                "mean": sum(avg_food_per_step) / len(avg_food_per_step),
-                "min": min(avg_food_per_step),
-                "max": max(avg_food_per_step),
-                "final": avg_food_per_step[-1]
+                "mean": float(avg_food_per_step.mean()),
+                "min": float(avg_food_per_step.min()),
+                "max": float(avg_food_per_step.max()),
+                "final": float(avg_food_per_step[-1])
             },
             "action_distribution": action_counts,
             "survival": {
@@ -1,9 +1,48 @@
+from core.state import ArrayField
+from core.sim_kernel import SCALE
+
+
 class Room:
-    """Represents a room in the simulation with food and connections to other rooms."""
-    
+    """Represents a room in the simulation with food and connections to other rooms.
+
+    Food, capacity and connections are stored in the owning Environment's
+    arrays once the room is bound; the object itself is a thin view.
+    """
+
+    __slots__ = ('_env', 'id', '_capacity', '_food', 'agents', '_connectedRooms')
+
+    food = ArrayField('room_food', float, scale=SCALE)
+    capacity = ArrayField('room_capacity', int)
+
     def __init__(self, id: int, capacity: int, connectedRooms: list[int], food: float = 1.0):
+        self._env = None
         self.id = id
         self.capacity = capacity
         self.food = food
         self.agents: list[int] = []  # Track agents currently in this room
-        self.connectedRooms = connectedRooms
\ No newline at end of file
+        self.connectedRooms = connectedRooms
+
+    @property
+    def connectedRooms(self) -> list[int]:
+        """Ids of connected rooms; once bound, read from the Environment's CSR arrays.
+
+        Returns a new sorted list, so edit connections by assigning to this
+        attribute rather than mutating the list.
+        """
+        if self._connectedRooms is not None:
+            return self._connectedRooms
+        offsets = self._env.conn_offsets
+        return self._env.conn_indices[offsets[self.id]:offsets[self.id + 1]].tolist()
+
+    @connectedRooms.setter
+    def connectedRooms(self, rooms: list[int]) -> None:
+        self._connectedRooms = list(rooms)
+        if self._env is not None:
+            # Rebuild the graph with the new connections, then read them back from it
+            self._env._init_graph(self._env.rooms)
+            self._connectedRooms = None
+
+    def bind(self, env) -> None:
+        """Attach this room to the environment holding its state arrays."""
+        self._env = env
+        self._connectedRooms = None
@@ -0,0 +1,206 @@
+"""Compiled per-step kernel operating on the Environment's state arrays."""
+
+import functools
+
+import numpy as np
+
+from core.actions import EAT, MOVE, TALK
+
+try:
+    from numba import njit, prange, types
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+    types = None
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so the kernels stay importable without Numba."""
+        return lambda fn: fn
+
+
+# Hunger and food are stored as uint8 fixed point: a value v means v / SCALE
+SCALE = 200
+HUNGRY = 80         # 0.4
+STARVING = 120      # 0.6
+FOOD_ENOUGH = 20    # 0.1
+FOOD_LOW = 40       # 0.2
+EAT_AMOUNT = 60     # 0.3 per meal
+HUNGER_STEP = 10    # 0.05 per step
+FOOD_REGEN = 10     # 0.05 per step
+TRUST_INCREASE = 0.05
+
+
+@njit(cache=True)
+def overcrowding_penalty(count, capacity):
+    """
+    Extra hunger, in fixed-point units, for an agent in a room above 75% occupancy.
+
+    This is (count / capacity - 0.75) * 0.1 rounded half up to the nearest
+    unit, computed with integers so every step path agrees exactly. At or
+    below 75% the expression is never positive, so clamping at zero is all
+    the thresholding needed.
+    """
+    return max(0, (40 * count - 29 * capacity) // (2 * capacity))
+
+
+def overcrowding_penalties(counts, capacities):
+    """Array version of overcrowding_penalty for the NumPy step path."""
+    return np.maximum(0, (40 * counts - 29 * capacities) // (2 * capacities))
+
+
+# Argument types of step_kernel, so each specialization is compiled eagerly
+if NUMBA_AVAILABLE:
+    STEP_SIGNATURE = (
+        types.uint8[::1], types.bool_[::1], types.int32[::1], types.float32[:, ::1],
+        types.uint8[::1], types.int32[::1], types.int32[::1], types.int32[::1], types.int32[::1],
+        types.float64[::1], types.float64[::1],
+    )
+else:
+    STEP_SIGNATURE = None
+
+
+# Below this many agents, starting worker threads costs more than the
+# parallel decide phase saves
+PARALLEL_MIN_AGENTS = 2048
+
+
+@functools.lru_cache(maxsize=None)
+def make_step_kernel(eat_amount=EAT_AMOUNT, hunger_step=HUNGER_STEP,
+                     food_regen=FOOD_REGEN, trust_increase=TRUST_INCREASE, parallel=False):
+    """
+    Build a step kernel with the environment rates frozen in as constants.
+
+    The rates are fixed for a whole run, so they are closed over rather than
+    passed in; Numba treats closure variables as compile-time constants and
+    folds them into the generated code. Each distinct set of rates is compiled
+    once, eagerly, and shared by every Environment that uses it.
+
+    With parallel, the decide phase runs across threads; every agent's
+    decision reads only start-of-step state. Resolution stays sequential
+    because agents in the same room compete for its food in id order.
+
+    Args:
+        eat_amount: Hunger removed and food consumed per meal, fixed point
+        hunger_step: Hunger added to every living agent per step, fixed point
+        food_regen: Food added to every room per step, fixed point
+        trust_increase: Trust gained toward a talk partner
+        parallel: Decide agents' actions on multiple threads
+
+    Returns:
+        The step kernel; see step_kernel for its arguments
+    """
+
+    # parallel only reaches Numba's on-disk cache key through the closure, so
+    # the decide loop's range function is closed over rather than chosen
+    # inside the kernel; otherwise serial and parallel builds share one entry
+    decide_range = prange if parallel else range
+
+    # Trust is float32; adding a float64 constant and rounding back would not
+    # always match the float32 arithmetic of the NumPy and batched paths
+    trust_step = np.float32(trust_increase)
+    trust_max = np.float32(1.0)
+
+    @njit(STEP_SIGNATURE, cache=True, fastmath=True, parallel=parallel)
+    def step_kernel(hunger, alive, location, trust, room_food, room_cap, room_count,
+                    conn_offsets, conn_indices, talk_draws, move_draws):
+        """
+        Decide, resolve and regenerate for one step, updating the arrays in place.
+
+        Args:
+            hunger: uint8[N] agent hunger, fixed point (see SCALE)
+            alive: bool[N] agent liveness
+            location: int32[N] room id of each agent
+            trust: float32[N, N] trust of agent i toward agent j
+            room_food: uint8[R] food per room, fixed point (see SCALE)
+            room_cap: int32[R] capacity per room
+            room_count: int32[R] living agents per room, updated as agents move
+            conn_offsets: int32[R+1] CSR offsets into conn_indices
+            conn_indices: int32[E] neighbor room ids, sorted within each room
+            talk_draws: float64[N] uniform draws used to pick a talk partner
+            move_draws: float64[N] uniform draws used to pick a move target
+
+        Returns:
+            (actions, targets) where actions is int8[N] (-1 for dead agents) and
+            targets is int32[N] (-1 when the action has no target)
+        """
+        n_agents = hunger.shape[0]
+        n_rooms = room_food.shape[0]
+        actions = np.full(n_agents, -1, np.int8)
+        targets = np.full(n_agents, -1, np.int32)
+
+        # Group living agents by room, keeping id order within each room
+        counts = room_count.copy()
+        starts = np.zeros(n_rooms + 1, np.int32)
+        for r in range(n_rooms):
+            starts[r + 1] = starts[r] + counts[r]
+        members = np.empty(starts[n_rooms], np.int32)
+        rank = np.zeros(n_agents, np.int32)
+        fill = starts[:n_rooms].copy()
+        for i in range(n_agents):
+            if alive[i]:
+                r = location[i]
+                rank[i] = fill[r] - starts[r]
+                members[fill[r]] = i
+                fill[r] += 1
+
+        # Decide, based on the state at the start of the step
+        for i in decide_range(n_agents):
+            if not alive[i]:
+                continue
+            r = location[i]
+            food = room_food[r]
+            degree = conn_offsets[r + 1] - conn_offsets[r]
+
+            if hunger[i] > HUNGRY and food > FOOD_ENOUGH:
+                actions[i] = EAT
+            elif hunger[i] > STARVING and food < FOOD_LOW and degree > 0:
+                actions[i] = MOVE
+                targets[i] = conn_indices[conn_offsets[r] + int(move_draws[i] * degree)]
+            elif counts[r] > 1:
+                k = int(talk_draws[i] * (counts[r] - 1))
+                if k >= rank[i]:
+                    k += 1
+                actions[i] = TALK
+                targets[i] = members[starts[r] + k]
+            elif degree > 0:
+                actions[i] = MOVE
+                targets[i] = conn_indices[conn_offsets[r] + int(move_draws[i] * degree)]
+            elif food > 0:
+                actions[i] = EAT
+            else:
+                actions[i] = TALK
+
+        # Resolve in agent order; moves check the occupancy at the start of the step
+        for i in range(n_agents):
+            action = actions[i]
+            r = location[i]
+            if action == EAT:
+                eaten = min(eat_amount, room_food[r])
+                room_food[r] -= eaten
+                hunger[i] = max(0, hunger[i] - eaten)
+            elif action == MOVE:
+                t = targets[i]
+                if counts[t] < room_cap[t]:
+                    location[i] = t
+                    room_count[r] -= 1
+                    room_count[t] += 1
+            elif action == TALK:
+                t = targets[i]
+                if t >= 0:
+                    trust[i, t] = min(trust_max, trust[i, t] + trust_step)
+
+        # Regenerate food in all rooms
+        for r in range(n_rooms):
+            room_food[r] = min(SCALE, room_food[r] + food_regen)
+
+        # Hunger increase, with a penalty in overcrowded rooms
+        for i in range(n_agents):
+            if alive[i]:
+                r = location[i]
+                hunger_increase = hunger_step + overcrowding_penalty(room_count[r], room_cap[r])
+                hunger[i] = min(SCALE, hunger[i] + hunger_increase)
+
+        return actions, targets
+
+    return step_kernel
@@ -0,0 +1,40 @@
+"""Array-backed attributes shared by the Agent and Room views."""
+
+
+class ArrayField:
+    """Attribute that lives in an Environment array once its owner is bound.
+
+    Until ``bind`` is called the value is kept on the instance, so agents and
+    rooms can be built before the Environment that owns their state. After
+    binding, reads and writes go to ``getattr(env, array)[owner.id]``.
+
+    With a ``scale`` the array holds fixed-point integers and the attribute
+    reads and writes the real value ``stored / scale``.
+    """
+
+    def __init__(self, array: str, cast: type, scale: int | None = None):
+        self.array = array
+        self.cast = cast
+        self.scale = scale
+
+    def __set_name__(self, owner, name):
+        self.local = '_' + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if obj._env is None:
+            return getattr(obj, self.local)
+        value = getattr(obj._env, self.array)[obj.id]
+        if self.scale is not None:
+            value = value / self.scale
+        return self.cast(value)
+
+    def __set__(self, obj, value):
+        if obj._env is None:
+            setattr(obj, self.local, value)
+        elif self.scale is not None:
+            stored = round(min(max(value, 0.0), 1.0) * self.scale)
+            getattr(obj._env, self.array)[obj.id] = stored
+        else:
+            getattr(obj._env, self.array)[obj.id] = value
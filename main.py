@@ -1,15 +1,259 @@
 """KillSim - Social Ecosystem Simulation"""
 
-from core import Room, Agent, Environment, SimulationLogger
-from core.config import load_config, validate_config
-import random
+from core import Action, BatchedEnvironment, Environment, SimulationLogger
+from core.config import load_config_cached
+from core.sim_kernel import SCALE
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import argparse
+import io
+import sys
+import time
+import numpy as np
 
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
 
-def main():
-    print("Loading configuration from config/parameters.yaml...")
-    config = load_config("config/parameters.yaml")
+# Two-decimal formatter for the step display, bound once
+_fmt = "{:.2f}".format
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="KillSim - Social Ecosystem Simulation")
+    parser.add_argument(
+        "--trace", action="store_true",
+        help="Print every agent's and room's state after each step instead of a progress bar"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true",
+        help="With --trace, list the agents in each room, not just the counts"
+    )
+    parser.add_argument(
+        "--worlds", type=int, default=1,
+        help="Run this many independent worlds in parallel and print a summary of each"
+    )
+    return parser.parse_args(argv)
+
+
+class StatusLine:
+    """Single-line progress display used when tqdm is not installed.
+    
+    Like tqdm's mininterval, the line is redrawn at most every mininterval
+    seconds. When the output is not a terminal it is only written once, on close.
+    """
+    
+    def __init__(self, total, file=None, mininterval=0.1):
+        self.total = total
+        self.n = 0
+        self.file = file if file is not None else sys.stderr
+        self.postfix = ""
+        self.mininterval = mininterval
+        self.interactive = self.file.isatty()
+        self._last_draw = None
+    
+    def set_postfix(self, refresh=True, **kwargs):
+        """Set the values shown after the step count."""
+        self.postfix = ", ".join(f"{key}={value:.3f}" for key, value in kwargs.items())
+    
+    def update(self, n=1):
+        """Advance by n steps, redrawing the line in place if it is due."""
+        self.n += n
+        if not self.interactive:
+            return
+        now = time.monotonic()
+        if self._last_draw is None or now - self._last_draw >= self.mininterval:
+            self._last_draw = now
+            self._draw()
+    
+    def _draw(self):
+        self.file.write(f"\rStep {self.n}/{self.total} [{self.postfix}]")
+        self.file.flush()
+    
+    def close(self):
+        """Draw the final state and finish the line."""
+        self._draw()
+        self.file.write("\n")
+        self.file.flush()
+
+
+def progress_bar(total):
+    """Return a tqdm progress bar when tqdm is installed, else a StatusLine."""
+    if tqdm is not None:
+        return tqdm(total=total, unit="step")
+    return StatusLine(total)
+
+
+def format_step(t, env, actions, verbose=False):
+    """
+    Render one step's actions, agent states and room states for the console.
+    
+    Args:
+        t: Timestep that was just run
+        env: Environment after the step
+        actions: Action decisions returned by env.step_with_actions()
+        verbose: Also list the agents in each room
+        
+    Returns:
+        The whole step's output as one string, so it is written in one call
+    """
+    buf = io.StringIO()
+    write = buf.write  # Bound once; called for every line of the step
+    write(f"Time step {t}\n")
     
-    errors = validate_config(config)
+    write("\nActions:\n")
+    for agent_id, (action, target) in actions.items():
+        if target is None:
+            write(f"  Agent {agent_id}: {action.name}\n")
+        else:
+            write(f"  Agent {agent_id}: {action.name} -> {target}\n")
+    
+    write("\nAgent States:\n")
+    hunger = (env.hunger / SCALE).tolist()
+    
+    # Gather every agent's non-zero trust entries in one pass over the matrix
+    trust_entries = [[] for _ in range(len(hunger))]
+    agent_ids, other_ids = np.nonzero(env.trust)
+    for agent_id, other_id, value in zip(
+        agent_ids.tolist(), other_ids.tolist(), env.trust[agent_ids, other_ids].tolist()
+    ):
+        trust_entries[agent_id].append(f"{other_id}:{_fmt(value)}")
+    
+    for agent_id, location in enumerate(env.location.tolist()):
+        trust_str = ", ".join(trust_entries[agent_id]) or "none"
+        
+        write(
+            f"  Agent {agent_id}: "
+            f"room={location}, "
+            f"hunger={_fmt(hunger[agent_id])}, "
+            f"trust=[{trust_str}]\n"
+        )
+    
+    write("\nRoom States:\n")
+    # Occupancy is kept up to date by the environment as agents move
+    counts = env.room_agent_count.tolist()
+    food = (env.room_food / SCALE).tolist()
+    capacity = env.room_capacity.tolist()
+    for room_id, room in enumerate(env.rooms):
+        occupancy = f"{counts[room_id]}/{capacity[room_id]}"
+        if verbose:
+            occupancy = f"{sorted(room.agents)} ({occupancy})"
+        write(
+            f"  Room {room_id}: "
+            f"food={_fmt(food[room_id])}, "
+            f"agents={occupancy}\n"
+        )
+    
+    return buf.getvalue()
+
+
+def run_world(config, seed):
+    """
+    Run one world to completion without display or logging.
+    
+    Args:
+        config: Validated simulation configuration
+        seed: Seed or SeedSequence for this world, used instead of config.simulation.seed
+        
+    Returns:
+        Dictionary with the world's final survival, hunger, food and action counts
+    """
+    env = Environment.from_config(config, rng=np.random.default_rng(seed))
+    
+    n_actions = len(Action)
+    totals = np.zeros(n_actions, np.int64)
+    for _ in range(config.simulation.steps):
+        codes, _ = env.step()
+        # Dead agents have code -1; shift so they land in a spare slot
+        totals += np.bincount(codes + 1, minlength=n_actions + 1)[1:]
+    
+    action_counts = {Action(code).name: int(count) for code, count in enumerate(totals.tolist()) if count}
+    return world_summary(env.alive, env.hunger, env.room_food, action_counts)
+
+
+def world_summary(alive, hunger, room_food, action_counts):
+    """Summarize one world's final state as returned by run_world and run_batched."""
+    return {
+        "alive": int(alive.sum()),
+        "avg_hunger": float(hunger[alive].mean() / SCALE) if alive.any() else 0.0,
+        "avg_food": float(room_food.mean() / SCALE),
+        "action_distribution": dict(action_counts)
+    }
+
+
+def run_batched(config, seeds, device):
+    """
+    Run all worlds together as one BatchedEnvironment.
+    
+    Args:
+        config: Validated simulation configuration
+        seeds: One seed or SeedSequence per world
+        device: "numpy", or a torch device such as "cuda"
+        
+    Returns:
+        List of world summaries, in world order
+    """
+    batch = BatchedEnvironment(config, [np.random.default_rng(seed) for seed in seeds], device=device)
+    for _ in range(config.simulation.steps):
+        batch.step()
+    
+    state = batch.state()
+    results = []
+    for k in range(len(seeds)):
+        action_counts = {
+            Action(code).name: int(count)
+            for code, count in enumerate(state['action_counts'][k].tolist()) if count
+        }
+        results.append(world_summary(state['alive'][k], state['hunger'][k], state['room_food'][k], action_counts))
+    return results
+
+
+def main_batch(config, n_worlds, max_workers=None):
+    """
+    Run independent worlds across worker processes.
+    
+    Each world draws from its own child of SeedSequence(config.simulation.seed),
+    so the streams are statistically independent and the whole batch is
+    reproducible from the one configured seed.
+    
+    By default each world is an Environment in its own worker process. With
+    config.simulation.device set, all worlds are instead stacked into one
+    BatchedEnvironment and stepped together on that device.
+    
+    Args:
+        config: Validated simulation configuration
+        n_worlds: Number of worlds to run
+        max_workers: Worker process count (default: one per CPU)
+        
+    Returns:
+        List of world summaries, in world order
+    """
+    seeds = np.random.SeedSequence(config.simulation.seed).spawn(n_worlds)
+    
+    if config.simulation.device is not None:
+        results = run_batched(config, seeds, config.simulation.device)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(partial(run_world, config), seeds))
+    
+    for k, result in enumerate(results):
+        print(
+            f"  World {k}: "
+            f"alive={result['alive']}/{len(config.agents)}, "
+            f"hunger={result['avg_hunger']:.3f}, "
+            f"food={result['avg_food']:.3f}"
+        )
+    
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    print("Loading configuration from config/parameters.yaml...")
+    config, errors = load_config_cached("config/parameters.yaml")
     if errors:
         print("Configuration validation errors:")
         for error in errors:
@@ -23,29 +267,22 @@ def main():
     print(f"  Logging: {'enabled' if config.logging.enabled else 'disabled'}")
     print()
     
+    if args.worlds > 1:
+        if config.logging.enabled:
+            print("Logging is skipped when running multiple worlds")
+        print(f"Running {args.worlds} worlds...\n")
+        main_batch(config, args.worlds)
+        return
+    
+    if config.simulation.device is not None:
+        print(f"simulation.device ({config.simulation.device}) only applies with --worlds; running one world on the CPU\n")
+
+    rng = np.random.default_rng(config.simulation.seed)
     if config.simulation.seed is not None:
-        random.seed(config.simulation.seed)
         print(f"Random seed set to: {config.simulation.seed}\n")
     
-    rooms = {}
-    for room_config in config.rooms:
-        rooms[room_config.id] = Room(
-            id=room_config.id,
-            capacity=room_config.capacity if room_config.capacity > 0 else 1,
-            connectedRooms=room_config.connected_to,
-            food=room_config.initial_food
-        )
-    
-    agents = []
-    for agent_config in config.agents:
-        agent = Agent(
-            id=agent_config.id,
-            location=agent_config.location,
-            hunger=agent_config.initial_hunger
-        )
-        agents.append(agent)
-    
-    env = Environment(rooms, agents)
+    env = Environment.from_config(config, rng=rng)
+    n_rooms = len(env.rooms)
     
     logger = None
     if config.logging.enabled:
@@ -56,51 +293,43 @@ def main():
         )
         logger.set_metadata(
             total_steps=config.simulation.steps,
-            num_agents=len(agents),
-            num_rooms=len(rooms),
+            num_agents=len(env.agents),
+            num_rooms=n_rooms,
             seed=config.simulation.seed
         )
         env.logger = logger
         print(f"Logger initialized: {config.logging.output_dir}/\n")
     
     print("Starting simulation...\n")
+    
+    # Full per-step state only with --trace; otherwise a single progress line.
+    # verbose_stdout: false turns off both.
+    trace = args.trace and config.logging.verbose_stdout
+    progress = None
+    if config.logging.verbose_stdout and not args.trace:
+        progress = progress_bar(config.simulation.steps)
+    
     for t in range(config.simulation.steps):
         if logger:
             env._current_step = t
-        print(f"Time step {t}")
-        
-        actions = env.step()
-        
-        print("\nActions:")
-        for agent_id, (action, target) in actions.items():
-            action_str = f"Agent {agent_id}: {action.name}"
-            if target is not None:
-                action_str += f" -> {target}"
-            print(f"  {action_str}")
         
-        print("\nAgent States:")
-        for agent in agents:
-            trust_str = ", ".join([f"{k}:{v:.2f}" for k, v in agent.trust.items()])
-            if not trust_str:
-                trust_str = "none"
-            
-            print(
-                f"  Agent {agent.id}: "
-                f"room={agent.location}, "
-                f"hunger={agent.hunger:.2f}, "
-                f"trust=[{trust_str}]"
-            )
+        # Only the trace needs the actions decoded into a dictionary
+        if trace:
+            actions = env.step_with_actions()
+            sys.stdout.write(format_step(t, env, actions, args.verbose))
+            continue
         
-        print("\nRoom States:")
-        for room_id, room in rooms.items():
-            agents_in_room = [a.id for a in agents if a.location == room_id]
-            print(
-                f"  Room {room_id}: "
-                f"food={room.food:.2f}, "
-                f"agents={agents_in_room} "
-                f"({len(agents_in_room)}/{room.capacity})"
+        env.step()
+        if progress is not None:
+            progress.set_postfix(
+                hunger=env.hunger.mean() / SCALE,
+                food=env.room_food.sum() / SCALE,
+                refresh=False
             )
+            progress.update()
     
+    if progress is not None:
+        progress.close()
     print("Simulation complete!")
 
     if logger:
@@ -110,11 +339,24 @@ def main():
             json_file = logger.export_json()
             print(f"  JSON: {json_file}")
         
+        if "json_columns" in config.logging.formats:
+            columns_file = logger.export_json_columns()
+            print(f"  JSON (columns): {columns_file}")
+        
+        if "ndjson" in config.logging.formats:
+            ndjson_file = logger.export_ndjson()
+            print(f"  NDJSON: {ndjson_file}")
+        
         if "csv" in config.logging.formats:
             csv_files = logger.export_csv()
             for file_type, filepath in csv_files.items():
                 print(f"  CSV ({file_type}): {filepath}")
         
+        if "parquet" in config.logging.formats:
+            parquet_files = logger.export_parquet()
+            for table, filepath in parquet_files.items():
+                print(f"  Parquet ({table}): {filepath}")
+        
         logger.print_summary()
 
 
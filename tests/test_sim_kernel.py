@@ -0,0 +1,54 @@
+"""Checks on how the compiled step kernels are cached."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numba")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Compile the serial kernel, then the parallel one, and report the parallel
+# kernel's on-disk cache hits and whether it starts a threading layer
+_SCRIPT = """
+import numba
+import numpy as np
+from core import sim_kernel
+
+sim_kernel.make_step_kernel(parallel=False)
+kernel = sim_kernel.make_step_kernel(parallel=True)
+print(sum(kernel.stats.cache_hits.values()))
+
+room_food = np.zeros(1, np.uint8)
+kernel(
+    np.zeros(2, np.uint8), np.ones(2, bool), np.zeros(2, np.int32), np.zeros((2, 2), np.float32),
+    room_food, np.full(1, 2, np.int32), np.full(1, 2, np.int32),
+    np.zeros(2, np.int32), np.zeros(0, np.int32), np.zeros(2), np.zeros(2),
+)
+print(numba.threading_layer())
+"""
+
+
+def _run(cache_dir):
+    env = dict(os.environ, NUMBA_CACHE_DIR=str(cache_dir))
+    result = subprocess.run(
+        [sys.executable, "-c", _SCRIPT], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    hits, layer = result.stdout.split()
+    return int(hits), layer
+
+
+def test_parallel_kernel_does_not_reuse_serial_cache(tmp_path):
+    # threading_layer() raises, failing the script, if no threads were started
+    hits, _ = _run(tmp_path)
+    assert hits == 0
+
+
+def test_parallel_kernel_is_cached_across_processes(tmp_path):
+    _run(tmp_path)
+    hits, _ = _run(tmp_path)
+    assert hits == 1
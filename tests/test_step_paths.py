@@ -0,0 +1,104 @@
+"""The NumPy, compiled and batched step paths must produce identical runs."""
+
+import importlib.util
+from functools import partial
+
+import numpy as np
+import pytest
+
+from core import BatchedEnvironment, Environment, sim_kernel
+from core.config import (
+    AgentConfig, Config, EnvironmentConfig, RoomConfig, SimulationConfig
+)
+
+STEPS = 300
+SEEDS = (0, 1, 2)
+# 0.01 is small enough that a float64 trust update rounds differently from float32
+TRUST_INCREASES = (0.01, 0.05, 0.2)
+
+
+def random_config(seed, trust_increase=0.2, n_rooms=12, n_agents=60):
+    """A random room graph with tight capacities, so moves get blocked and rooms overcrowd."""
+    rng = np.random.default_rng(seed)
+    rooms = []
+    for room_id in range(n_rooms):
+        # Roughly one room in six has no exits
+        n_exits = 0 if rng.random() < 0.15 else int(rng.integers(1, 4))
+        others = [r for r in range(n_rooms) if r != room_id]
+        rooms.append(RoomConfig(
+            id=room_id,
+            capacity=int(rng.integers(2, 10)),
+            connected_to=sorted(int(r) for r in rng.choice(others, n_exits, replace=False)),
+            initial_food=float(rng.random())
+        ))
+    agents = [
+        AgentConfig(id=agent_id, location=int(rng.integers(n_rooms)), initial_hunger=float(rng.random()))
+        for agent_id in range(n_agents)
+    ]
+    return Config(
+        simulation=SimulationConfig(steps=STEPS, seed=seed),
+        environment=EnvironmentConfig(
+            food_regen_rate=0.03, hunger_increase_rate=0.07, eat_amount=0.25, trust_increase=trust_increase
+        ),
+        rooms=rooms,
+        agents=agents
+    )
+
+
+def run_environment(config, kernel):
+    """Run an Environment through the NumPy path ("python") or the "serial" or "parallel" kernel."""
+    env = Environment.from_config(
+        config, rng=np.random.default_rng(config.simulation.seed), compile_kernel=False
+    )
+    if kernel != "python":
+        env._kernel = sim_kernel.make_step_kernel(
+            env.eat_amount, env.hunger_step, env.food_regen, env.trust_increase,
+            parallel=kernel == "parallel"
+        )
+
+    steps = [env.step() for _ in range(config.simulation.steps)]
+    state = {
+        'hunger': env.hunger, 'alive': env.alive, 'location': env.location,
+        'trust': env.trust, 'room_food': env.room_food,
+    }
+    return steps, state
+
+
+def run_batched(config, device):
+    """Run the config as a single world of a BatchedEnvironment."""
+    batch = BatchedEnvironment(config, [np.random.default_rng(config.simulation.seed)], device=device)
+    to_numpy = batch.ops.to_numpy
+    steps = []
+    for _ in range(config.simulation.steps):
+        codes, targets = batch.step()
+        steps.append((to_numpy(codes)[0], to_numpy(targets)[0]))
+    state = {key: value[0] for key, value in batch.state().items() if key != 'action_counts'}
+    return steps, state
+
+
+requires_numba = pytest.mark.skipif(not sim_kernel.NUMBA_AVAILABLE, reason="Numba is not installed")
+requires_torch = pytest.mark.skipif(
+    importlib.util.find_spec("torch") is None, reason="PyTorch is not installed"
+)
+
+PATHS = [
+    pytest.param(partial(run_environment, kernel="serial"), id="numba-serial", marks=requires_numba),
+    pytest.param(partial(run_environment, kernel="parallel"), id="numba-parallel", marks=requires_numba),
+    pytest.param(partial(run_batched, device=None), id="batched-numpy"),
+    pytest.param(partial(run_batched, device="cpu"), id="batched-torch", marks=requires_torch),
+]
+
+
+@pytest.mark.parametrize("trust_increase", TRUST_INCREASES)
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("run", PATHS)
+def test_matches_numpy_path(run, seed, trust_increase):
+    config = random_config(seed, trust_increase)
+    expected_steps, expected_state = run_environment(config, "python")
+    steps, state = run(config)
+
+    for t, ((expected_codes, expected_targets), (codes, targets)) in enumerate(zip(expected_steps, steps)):
+        np.testing.assert_array_equal(codes, expected_codes, err_msg=f"codes at step {t}")
+        np.testing.assert_array_equal(targets, expected_targets, err_msg=f"targets at step {t}")
+    for key, expected in expected_state.items():
+        np.testing.assert_array_equal(state[key], expected, err_msg=key)